@@ -3,60 +3,157 @@ import os
 import ast
 import zipfile
 import tempfile
-import networkx as nx
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pyvis.network import Network
 
+# Most distinct file contents whose imports are remembered
+IMPORT_CACHE_SIZE = 4096
+
+
+@st.cache_resource
+def _import_cache():
+    """
+    Content digest -> imports, shared across reruns and sessions.
+
+    Uploads are extracted into a fresh temporary directory every time, so paths never
+    repeat; the file contents do, whenever the same project is uploaded again.
+    """
+    return OrderedDict(), threading.Lock()
+
+
 # ------------------------------
 # Helper: extract imports from a file
 # ------------------------------
-def extract_imports(file_path):
+def _parse_imports(source, filename):
+    """Parse source and return (imports, error). Runs in worker processes, so no Streamlit calls here."""
     imports = []
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            tree = ast.parse(f.read(), filename=file_path)
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Import):
-                    for alias in node.names:
-                        imports.append(alias.name.split('.')[0])
-                elif isinstance(node, ast.ImportFrom):
-                    if node.module:
-                        imports.append(node.module.split('.')[0])
+        tree = ast.parse(source.decode("utf-8"), filename=filename)
     except Exception as e:
-        st.warning(f"Could not parse {file_path}: {e}")
-    return imports
+        return (), str(e)
+
+    # Imports live at module level (possibly under a top-level try/if/with), so only
+    # those bodies are scanned; function and class bodies are never entered
+    stack = list(tree.body)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                imports.append(alias.name.split('.')[0])
+        elif isinstance(node, ast.ImportFrom):
+            if node.module:
+                imports.append(node.module.split('.')[0])
+        elif isinstance(node, ast.If):
+            stack.extend(node.body)
+            stack.extend(node.orelse)
+        elif isinstance(node, ast.With):
+            stack.extend(node.body)
+        elif isinstance(node, ast.Try):
+            stack.extend(node.body)
+            for handler in node.handlers:
+                stack.extend(handler.body)
+            stack.extend(node.orelse)
+            stack.extend(node.finalbody)
+    return tuple(imports), None
+
+
+def extract_imports(sources):
+    """
+    Map each path in sources (path -> file bytes) to the modules it imports.
+
+    Only contents not already in the cache are parsed, in parallel; ast.parse is
+    CPU-bound so processes beat threads.
+    """
+    cache, lock = _import_cache()
+    keys = {path: hashlib.blake2b(source, digest_size=16).digest() for path, source in sources.items()}
+    with lock:
+        found = {key: cache[key] for key in set(keys.values()) if key in cache}
+        for key in found:
+            cache.move_to_end(key)
+
+    pending = {}  # digest -> path of one file with that content
+    for path, key in keys.items():
+        if key not in found:
+            pending.setdefault(key, path)
+    if pending:
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count(), len(pending))) as executor:
+            results = executor.map(
+                _parse_imports, [sources[path] for path in pending.values()], pending.values(), chunksize=16
+            )
+            for (key, path), (imports, error) in zip(pending.items(), results):
+                if error:
+                    st.warning(f"Could not parse {path}: {error}")
+                found[key] = imports
+        with lock:
+            cache.update((key, found[key]) for key in pending)
+            while len(cache) > IMPORT_CACHE_SIZE:
+                cache.popitem(last=False)
+
+    return {path: found[key] for path, key in keys.items()}
 
 
 # ------------------------------
 # Build dependency graph
 # ------------------------------
+# Directories that never hold project modules
+SKIP_DIRS = {"__pycache__", ".git", ".venv", "venv", "node_modules"}
+
+
+def iter_py_files(base_path):
+    """Yield .py paths under base_path, using the file types scandir already read."""
+    subdirs = []
+    with os.scandir(base_path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in SKIP_DIRS:
+                    subdirs.append(entry.path)
+            elif entry.name.endswith(".py"):
+                yield entry.path
+    # Files before subdirectories, as os.walk ordered them
+    for subdir in subdirs:
+        yield from iter_py_files(subdir)
+
+
 def build_dependency_graph(base_path):
-    G = nx.DiGraph()
+    """Return (nodes, edges): module names and deduplicated (importer, imported) pairs."""
     py_files = {}
 
     # Map filenames (without extension) to paths
-    for root, _, files in os.walk(base_path):
-        for file in files:
-            if file.endswith(".py"):
-                file_name = os.path.splitext(file)[0]
-                py_files[file_name] = os.path.join(root, file)
-
-    # Build graph
+    for path in iter_py_files(base_path):
+        file_name = os.path.splitext(os.path.basename(path))[0]
+        # Relative paths keep the parse warnings free of the temporary directory
+        py_files[file_name] = os.path.relpath(path, base_path)
+
+    # Read each file once; its bytes are both the cache key and the parser input
+    sources = {}
+    for path in py_files.values():
+        with open(os.path.join(base_path, path), "rb") as f:
+            sources[path] = f.read()
+    imports_by_path = extract_imports(sources)
+
+    # Build graph; plain containers are all pyvis needs, so no networkx graph is built
+    nodes = list(py_files)
+    edges = {}  # insertion-ordered set
     for module, path in py_files.items():
-        G.add_node(module)
-        imports = extract_imports(path)
-        for imp in imports:
+        for imp in imports_by_path[path]:
             if imp in py_files:  # only link if module is inside repo
-                G.add_edge(module, imp)
+                edges[(module, imp)] = None
 
-    return G
+    return nodes, list(edges)
 
 
 # ------------------------------
 # Render graph in Streamlit
 # ------------------------------
-def render_graph(G):
+def render_graph(nodes, edges):
     net = Network(height="600px", width="100%", bgcolor="#222222", font_color="white", directed=True)
-    net.from_nx(G)
+    # Same node size and edge width Network.from_nx used by default
+    net.add_nodes(nodes, size=[10] * len(nodes))
+    for source, target in edges:
+        net.add_edge(source, target, width=1)
     return net
 
 
@@ -77,11 +174,11 @@ if uploaded_file is not None:
             zip_ref.extractall(tmpdir)
 
         st.info("Building dependency graph... ⏳")
-        G = build_dependency_graph(tmpdir)
+        nodes, edges = build_dependency_graph(tmpdir)
 
         st.success("Graph built successfully! 🎉")
 
-        net = render_graph(G)
+        net = render_graph(nodes, edges)
         net.save_graph("graph.html")
 
         # Display inside Streamlit
@@ -1,25 +1,33 @@
 import re
 import html
 
+# Pattern to capture full header block
+HEADER_BLOCK_RE = re.compile(r"From:.*?Subject:.*?(?=\r?\n\r?\n|From:|$)", re.DOTALL)
+
+# One compiled pattern per header field, searched separately: each keeps the engine's
+# fast scan for its literal prefix, which a single alternation would lose
+FROM_RE = re.compile(r"From:\s*(.*)")
+SENT_RE = re.compile(r"Sent:\s*(.*)")
+TO_RE = re.compile(r"To:\s*(.*)")
+CC_RE = re.compile(r"Cc:\s*(.*)")
+SUBJECT_RE = re.compile(r"Subject:\s*(.*)")
+
 def extract_email_headers(text):
     # Fix encoded HTML characters
     text = html.unescape(text)
 
-    # Pattern to capture full header block
-    pattern = r"From:.*?Subject:.*?(?=\r?\n\r?\n|From:|$)"
-
-    blocks = re.findall(pattern, text, flags=re.DOTALL)
+    blocks = HEADER_BLOCK_RE.findall(text)
 
     extracted_data = []
 
     for block in blocks:
         data = {}
 
-        from_match = re.search(r"From:\s*(.*)", block)
-        sent_match = re.search(r"Sent:\s*(.*)", block)
-        to_match = re.search(r"To:\s*(.*)", block)
-        cc_match = re.search(r"Cc:\s*(.*)", block)
-        subject_match = re.search(r"Subject:\s*(.*)", block)
+        from_match = FROM_RE.search(block)
+        sent_match = SENT_RE.search(block)
+        to_match = TO_RE.search(block)
+        cc_match = CC_RE.search(block)
+        subject_match = SUBJECT_RE.search(block)
 
         data["from"] = from_match.group(1).strip() if from_match else None
         data["sent"] = sent_match.group(1).strip() if sent_match else None
@@ -1,12 +1,119 @@
 import os
 import re
-import PyPDF2
+import asyncio
+import mmap
+import numpy as np
+import pypdf
 import concurrent.futures
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from itertools import accumulate, repeat
 from typing import List, Dict, Tuple, Optional
-import json
+import orjson
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    # Without numba the helpers below simply run as plain Python; callers with a
+    # faster pure-Python route check HAVE_NUMBA and use it instead
+    HAVE_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+
+@contextmanager
+def _open_pdf(pdf_path: str):
+    """
+    Open a PDF for reading through a read-only memory map.
+    
+    The kernel pages the file in on demand as pypdf seeks through it, and reads are
+    served straight from the mapping rather than through a buffered file object.
+    """
+    with open(pdf_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield pypdf.PdfReader(mapped)
+
+
+@njit(cache=True)
+def _paragraph_cut_points(offsets: np.ndarray, chunk_size: int) -> np.ndarray:
+    """
+    Greedy chunk cut points over paragraph start offsets.
+    
+    offsets[k] is where paragraph k starts when every paragraph is followed by a
+    two-character separator, with offsets[-1] the total length. Returns the index
+    of the first paragraph of each chunk followed by the paragraph count.
+    """
+    count = len(offsets) - 1
+    cuts = np.empty(count + 1, dtype=np.int64)
+    cuts[0] = 0
+    n_cuts = 1
+    start = 0
+    for k in range(1, count):
+        # Paragraph k no longer fits once the chunk up to and including it,
+        # minus its trailing separator, reaches chunk_size
+        if offsets[k + 1] - 2 - offsets[start] >= chunk_size:
+            cuts[n_cuts] = k
+            n_cuts += 1
+            start = k
+    cuts[n_cuts] = count
+    return cuts[:n_cuts + 1]
+
+
+def _paragraph_cut_points_bisect(offsets: List[int], chunk_size: int) -> List[int]:
+    """
+    Same cut points as _paragraph_cut_points, found by binary search over a list.
+    
+    Used when numba is missing: an interpreted sweep over NumPy scalars is slower
+    than bisect on plain ints.
+    """
+    count = len(offsets) - 1
+    cuts = [0]
+    start = 0
+    while start < count:
+        # Paragraph k fits while offsets[k + 1] - 2 - offsets[start] < chunk_size;
+        # the first paragraph of a chunk is always taken
+        limit = offsets[start] + chunk_size + 2
+        start = max(start + 1, bisect_left(offsets, limit, start + 1) - 1)
+        cuts.append(start)
+    return cuts
+
+
+# Below this many pages, text is extracted in-process: starting a worker pool
+# costs more than it saves
+PARALLEL_EXTRACT_MIN_PAGES = 16
+
+
+def _extract_pages(pdf_path: str, start: int, stop: int) -> List[str]:
+    """
+    Extract the text of pages start..stop-1. Top-level so it can run in a worker process.
+    
+    The PDF is opened, and its page tree built, once per range rather than once per page.
+    """
+    with _open_pdf(pdf_path) as reader:
+        return [reader.pages[i].extract_text() for i in range(start, stop)]
+
 
 class PDFSummarizer:
-    def __init__(self, llm_api_wrapper, chunk_size=2000, overlap=200, max_workers=4):
+    # Patterns for financial document section headers
+    SECTION_PATTERNS = [
+        r'\n\s*(?:SECTION|Section)\s+\d+[.:]\s+\w+',  # Section 1: Introduction
+        r'\n\s*\d+(?:\.\d+)*\s+[A-Z][a-zA-Z\s]+',     # 1.2 Important Terms
+        r'\n\s*[IVXLCDM]+\.\s+[A-Z][a-zA-Z\s]+',      # IV. Risk Factors
+        r'\n\s*[A-Z][A-Z\s]{2,}(?:\s*\([^)]+\))?\s*$', # RISK FACTORS (all caps)
+        r'\n\s*(?:ARTICLE|Article)\s+[IVXLCDM]+[.:]\s+\w+', # Article IV: Terms
+    ]
+    # Compiled once. Each pattern is scanned on its own: finditer consumes every match,
+    # so the leading \n\s* of one header is never reported again at each of its newlines,
+    # while headers found by different patterns may still overlap
+    _section_res = [re.compile(p, re.MULTILINE) for p in SECTION_PATTERNS]
+
+    BACKENDS = ("thread", "process", "asyncio")
+
+    def __init__(self, llm_api_wrapper, chunk_size=2000, overlap=200, max_workers=4, async_llm_api=None,
+                 backend="thread"):
         """
         Initialize the PDF summarizer with the LLM API wrapper.
         
@@ -15,16 +122,34 @@ class PDFSummarizer:
             chunk_size: The approximate size of chunks to process
             overlap: The amount of overlap between chunks
             max_workers: Maximum number of parallel workers for processing
+            async_llm_api: Optional coroutine function taking a prompt string and returning
+                a response string, used by asummarize_pdf (e.g. built on aiohttp)
+            backend: How summarize_pdf runs the map phase: "thread" for remote HTTP APIs,
+                "process" for in-process models that hold the GIL (llm_api must be
+                picklable), or "asyncio" to delegate to asummarize_pdf
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"backend must be one of {self.BACKENDS}, got {backend!r}")
         self.llm_api = llm_api_wrapper
+        self.async_llm_api = async_llm_api
         self.chunk_size = chunk_size
         self.overlap = overlap
         self.max_workers = max_workers
+        self.backend = backend
+        self.executor_cls = (
+            concurrent.futures.ProcessPoolExecutor if backend == "process" else concurrent.futures.ThreadPoolExecutor
+        )
+        
+    def extract_text_and_metadata(self, pdf_path: str) -> Tuple[List[Tuple[int, str]], Dict]:
+        """
+        Extract text and metadata from a PDF file.
         
-    def extract_text_and_metadata(self, pdf_path: str) -> Tuple[str, Dict]:
-        """Extract text and metadata from a PDF file."""
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
+        Text comes back as a list of (page_number, page_text) tuples for the non-empty
+        pages rather than one joined string. The chunking methods treat it as the
+        document "[Page n] text" with pages separated by a blank line, but only ever
+        materialize the slices they emit.
+        """
+        with _open_pdf(pdf_path) as reader:
             
             # Extract metadata
             metadata = {
@@ -36,98 +161,132 @@ class PDFSummarizer:
                 'modification_date': reader.metadata.get('/ModDate', ''),
                 'page_count': len(reader.pages)
             }
+            page_count = len(reader.pages)
+            parallel = page_count >= PARALLEL_EXTRACT_MIN_PAGES and self.max_workers > 1
+            if not parallel:
+                # Small documents reuse the reader that is already open
+                texts = [page.extract_text() for page in reader.pages]
             
-            # Extract text with page numbers
-            text_with_page = []
-            for i, page in enumerate(reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():  # Only add non-empty pages
-                    text_with_page.append(f"[Page {i+1}] {page_text}")
+        # Extract text with page numbers; extraction is CPU-bound, so larger documents
+        # are split into contiguous page ranges spread across processes (a few ranges
+        # per worker, so one slow range doesn't leave the others idle)
+        if parallel:
+            n_ranges = min(page_count, self.max_workers * 4)
+            bounds = [page_count * k // n_ranges for k in range(n_ranges + 1)]
+            with concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                ranges = executor.map(_extract_pages, repeat(pdf_path), bounds[:-1], bounds[1:])
+                texts = [page_text for texts_in_range in ranges for page_text in texts_in_range]
             
-            full_text = "\n\n".join(text_with_page)
+        pages = [(i + 1, page_text) for i, page_text in enumerate(texts) if page_text.strip()]  # Only keep non-empty pages
             
-            return full_text, metadata
+        return pages, metadata
+    
+    @staticmethod
+    def page_header(page_no: int) -> str:
+        """Marker that starts each page in the document text."""
+        return f"[Page {page_no}] "
     
-    def detect_section_boundaries(self, text: str) -> List[int]:
+    def page_offsets(self, pages: List[Tuple[int, str]]) -> List[int]:
+        """Offset in the document text at which each page (its header) starts."""
+        offsets = []
+        offset = 0
+        for page_no, page_text in pages:
+            offsets.append(offset)
+            offset += len(self.page_header(page_no)) + len(page_text) + 2
+        return offsets
+    
+    def slice_pages(self, pages: List[Tuple[int, str]], offsets: List[int], start: int, end: int) -> str:
+        """Return document_text[start:end] without building the whole document."""
+        pieces = []
+        k = max(bisect_right(offsets, start) - 1, 0)
+        while k < len(pages) and offsets[k] < end:
+            page_no, page_text = pages[k]
+            pos = offsets[k]
+            separator = "\n\n" if k + 1 < len(pages) else ""
+            for part in (self.page_header(page_no), page_text, separator):
+                lo, hi = max(start - pos, 0), min(end - pos, len(part))
+                if lo < hi:
+                    pieces.append(part[lo:hi])
+                pos += len(part)
+            k += 1
+        return "".join(pieces)
+    
+    def detect_section_boundaries(self, pages: List[Tuple[int, str]]) -> List[int]:
         """
         Detect section boundaries in the text based on common section header patterns.
-        Returns list of indices where sections start.
+        Returns list of document offsets where sections start.
         """
-        # Patterns for financial document section headers
-        patterns = [
-            r'\n\s*(?:SECTION|Section)\s+\d+[.:]\s+\w+',  # Section 1: Introduction
-            r'\n\s*\d+(?:\.\d+)*\s+[A-Z][a-zA-Z\s]+',     # 1.2 Important Terms
-            r'\n\s*[IVXLCDM]+\.\s+[A-Z][a-zA-Z\s]+',      # IV. Risk Factors
-            r'\n\s*[A-Z][A-Z\s]{2,}(?:\s*\([^)]+\))?\s*$', # RISK FACTORS (all caps)
-            r'\n\s*(?:ARTICLE|Article)\s+[IVXLCDM]+[.:]\s+\w+', # Article IV: Terms
-        ]
+        # Always include the start of the document; each page is scanned once per
+        # pattern and its matches shifted to document offsets
+        boundaries = [0]
+        for offset, (page_no, page_text) in zip(self.page_offsets(pages), pages):
+            text_start = offset + len(self.page_header(page_no))
+            for section_re in self._section_res:
+                boundaries.extend(text_start + match.start() for match in section_re.finditer(page_text))
         
-        # Find all matches
-        boundaries = [0]  # Always include the start of the document
-        for pattern in patterns:
-            for match in re.finditer(pattern, text):
-                boundaries.append(match.start())
-                
         # Sort and deduplicate
         boundaries = sorted(set(boundaries))
         return boundaries
         
-    def create_semantic_chunks(self, text: str) -> List[str]:
+    def create_semantic_chunks(self, pages: List[Tuple[int, str]]) -> List[str]:
         """
         Split text into semantic chunks based on detected section boundaries.
         Falls back to size-based chunking if no clear sections are found.
         """
-        boundaries = self.detect_section_boundaries(text)
+        boundaries = self.detect_section_boundaries(pages)
         
         # If we have a reasonable number of sections, use them
         if len(boundaries) > 1 and len(boundaries) < 30:  # Avoid over-chunking
-            chunks = []
-            for i in range(len(boundaries) - 1):
-                chunk = text[boundaries[i]:boundaries[i+1]]
-                chunks.append(chunk)
-            # Add the last section
-            chunks.append(text[boundaries[-1]:])
+            offsets = self.page_offsets(pages)
+            ends = boundaries[1:] + [offsets[-1] + len(self.page_header(pages[-1][0])) + len(pages[-1][1])]
+            chunks = [self.slice_pages(pages, offsets, start, end) for start, end in zip(boundaries, ends)]
             
             # Further split any chunks that are too big
             final_chunks = []
             for chunk in chunks:
                 if len(chunk) > self.chunk_size * 1.5:
                     # Split by paragraphs if chunk is too big
-                    paragraphs = chunk.split('\n\n')
-                    current_chunk = ""
-                    for para in paragraphs:
-                        if len(current_chunk) + len(para) < self.chunk_size:
-                            current_chunk += para + "\n\n"
-                        else:
-                            if current_chunk:
-                                final_chunks.append(current_chunk)
-                            current_chunk = para + "\n\n"
-                    if current_chunk:
-                        final_chunks.append(current_chunk)
+                    final_chunks.extend(self.pack_paragraphs(chunk.split('\n\n')))
                 else:
                     final_chunks.append(chunk)
             return final_chunks
             
         # Fallback: Split by approximate size with paragraph boundaries
         else:
-            paragraphs = text.split('\n\n')
-            chunks = []
-            current_chunk = ""
-            
-            for para in paragraphs:
-                if len(current_chunk) + len(para) < self.chunk_size:
-                    current_chunk += para + "\n\n"
-                else:
-                    chunks.append(current_chunk)
-                    current_chunk = para + "\n\n"
-                    
-            if current_chunk:  # Add the last chunk
-                chunks.append(current_chunk)
-                
-            return chunks
+            paragraphs = []
+            for page_no, page_text in pages:
+                page_paragraphs = page_text.split('\n\n')
+                page_paragraphs[0] = self.page_header(page_no) + page_paragraphs[0]
+                paragraphs.extend(page_paragraphs)
+            return self.pack_paragraphs(paragraphs or [""])
     
-    def summarize_chunk(self, chunk: str, metadata: Dict, is_financial: bool = True) -> str:
-        """Summarize a single chunk using the LLM API."""
+    def pack_paragraphs(self, paragraphs: List[str]) -> List[str]:
+        """
+        Greedily pack consecutive paragraphs into chunks of about chunk_size characters.
+        
+        A paragraph joins the current chunk while the chunk plus that paragraph stays
+        under chunk_size; each paragraph is followed by its "\n\n" separator. Cut points
+        come from a prefix sum of paragraph lengths, swept by a numba-compiled helper
+        when numba is installed and binary-searched otherwise, so the text is only
+        copied once per emitted chunk.
+        """
+        if not paragraphs:
+            return []
+        
+        # offsets[k] is where paragraph k starts once every paragraph gets its separator
+        if HAVE_NUMBA:
+            offsets = np.zeros(len(paragraphs) + 1, dtype=np.int64)
+            np.cumsum(np.fromiter((len(para) + 2 for para in paragraphs), dtype=np.int64, count=len(paragraphs)),
+                      out=offsets[1:])
+            cuts = _paragraph_cut_points(offsets, self.chunk_size).tolist()
+        else:
+            offsets = [0]
+            offsets.extend(accumulate(len(para) + 2 for para in paragraphs))
+            cuts = _paragraph_cut_points_bisect(offsets, self.chunk_size)
+        return ["\n\n".join(paragraphs[start:end]) + "\n\n" for start, end in zip(cuts, cuts[1:])]
+    
+    def build_chunk_prompt(self, chunk: str, metadata: Dict, is_financial: bool = True) -> str:
+        """Build the prompt that summarizes a single chunk."""
         # Create a prompt that emphasizes financial terms and policies
         if is_financial:
             prompt = f"""Summarize the following section of a financial document. 
@@ -149,14 +308,26 @@ Document Section:
 {chunk}
 
 Provide a concise yet comprehensive summary:"""
-        
-        # Call the LLM API
-        response = self.llm_api(prompt)
-        return response
+        return prompt
     
-    def summarize_summaries(self, summaries: List[str], metadata: Dict, is_financial: bool = True) -> str:
-        """Combine the individual summaries into a coherent final summary."""
-        all_summaries = "\n\n".join([f"Section {i+1} Summary:\n{summary}" for i, summary in enumerate(summaries)])
+    @staticmethod
+    def section_label(lo: int, hi: int) -> str:
+        """Label for the summary of chunks lo..hi-1, numbered from 1."""
+        return f"Section {lo + 1}" if hi - lo == 1 else f"Sections {lo + 1}-{hi}"
+    
+    def build_summaries_prompt(self, summaries: List[str], metadata: Dict, is_financial: bool = True,
+                               ranges: Optional[List[Tuple[int, int]]] = None) -> str:
+        """
+        Build the prompt that combines individual summaries into one.
+        
+        ranges gives the (lo, hi) chunk range each summary covers; by default
+        summary i is of chunk i.
+        """
+        if ranges is None:
+            ranges = [(i, i + 1) for i in range(len(summaries))]
+        all_summaries = "\n\n".join(
+            [f"{self.section_label(lo, hi)} Summary:\n{summary}" for (lo, hi), summary in zip(ranges, summaries)]
+        )
         
         if is_financial:
             prompt = f"""You are creating a final comprehensive summary of a financial document.
@@ -189,10 +360,15 @@ Total Pages: {metadata.get('page_count', 'Unknown')}
 {all_summaries}
 
 Create a well-structured final summary of the entire document that captures all the key information and maintains the logical flow:"""
-        
-        # Call the LLM API
-        response = self.llm_api(prompt)
-        return response
+        return prompt
+
+    def summarize_chunk(self, chunk: str, metadata: Dict, is_financial: bool = True) -> str:
+        """Summarize a single chunk using the LLM API."""
+        return self.llm_api(self.build_chunk_prompt(chunk, metadata, is_financial))
+    
+    def summarize_summaries(self, summaries: List[str], metadata: Dict, is_financial: bool = True) -> str:
+        """Combine the individual summaries into a coherent final summary."""
+        return self.llm_api(self.build_summaries_prompt(summaries, metadata, is_financial))
 
     def summarize_pdf(self, pdf_path: str, is_financial: bool = True) -> Dict:
         """
@@ -205,15 +381,18 @@ Create a well-structured final summary of the entire document that captures all
         Returns:
             Dict containing the summary and metadata
         """
+        if self.backend == "asyncio":
+            return asyncio.run(self.asummarize_pdf(pdf_path, is_financial))
+        
         # Extract text and metadata
-        text, metadata = self.extract_text_and_metadata(pdf_path)
+        pages, metadata = self.extract_text_and_metadata(pdf_path)
         
         # Create semantic chunks
-        chunks = self.create_semantic_chunks(text)
+        chunks = self.create_semantic_chunks(pages)
         
         # Map phase: Summarize each chunk in parallel
         chunk_summaries = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+        with self.executor_cls(max_workers=self.max_workers) as executor:
             future_to_chunk = {
                 executor.submit(self.summarize_chunk, chunk, metadata, is_financial): i 
                 for i, chunk in enumerate(chunks)
@@ -243,6 +422,68 @@ Create a well-structured final summary of the entire document that captures all
             "final_summary": final_summary
         }
 
+    async def asummarize_pdf(self, pdf_path: str, is_financial: bool = True) -> Dict:
+        """
+        Asynchronous variant of summarize_pdf for I/O-bound LLM APIs.
+        
+        At most max_workers LLM calls are in flight at once. Instead of one reduce
+        step after the whole map phase, summaries are merged pairwise in a tree as
+        soon as both halves are ready, so the final merge is O(log N) deep and
+        starts right after the last chunk finishes. Each merge labels its inputs
+        with the chunk ranges they cover.
+        
+        Args:
+            pdf_path: Path to the PDF file
+            is_financial: Whether to use financial-specific prompting
+            
+        Returns:
+            Dict containing the summary and metadata
+        """
+        pages, metadata = await asyncio.to_thread(self.extract_text_and_metadata, pdf_path)
+        chunks = self.create_semantic_chunks(pages)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        
+        async def call_llm(prompt: str) -> str:
+            async with semaphore:
+                if self.async_llm_api is not None:
+                    return await self.async_llm_api(prompt)
+                # Fall back to the blocking wrapper without stalling the event loop
+                return await asyncio.to_thread(self.llm_api, prompt)
+        
+        async def summarize(i: int) -> str:
+            try:
+                return await call_llm(self.build_chunk_prompt(chunks[i], metadata, is_financial))
+            except Exception as e:
+                print(f"Error processing chunk {i}: {e}")
+                return f"[Error summarizing this section: {e}]"
+        
+        # Map phase: every chunk is scheduled up front; the semaphore bounds concurrency
+        chunk_tasks = [asyncio.create_task(summarize(i)) for i in range(len(chunks))]
+        
+        # Reduce phase: merge adjacent ranges as soon as both sides are done. The root
+        # always runs the combine prompt, even over a single chunk, so the result has
+        # the same shape as summarize_pdf's
+        async def reduce(lo: int, hi: int, final: bool = False) -> str:
+            if hi - lo == 1 and not final:
+                return await chunk_tasks[lo]
+            if hi - lo <= 1:
+                ranges = [(lo, hi)] if hi > lo else []
+            else:
+                mid = (lo + hi) // 2
+                ranges = [(lo, mid), (mid, hi)]
+            parts = await asyncio.gather(*(reduce(a, b) for a, b in ranges))
+            return await call_llm(self.build_summaries_prompt(list(parts), metadata, is_financial, ranges))
+        
+        final_summary = await reduce(0, len(chunk_tasks), final=True)
+        summaries = [task.result() for task in chunk_tasks]
+        
+        return {
+            "metadata": metadata,
+            "chunk_count": len(chunks),
+            "section_summaries": summaries,
+            "final_summary": final_summary
+        }
+
 
 # Example usage with a simple LLM API wrapper
 def example_llm_api(prompt: str) -> str:
@@ -268,5 +509,5 @@ if __name__ == "__main__":
     print(result['final_summary'])
     
     # Save the full result to a JSON file
-    with open("summary_result.json", "w") as f:
-        json.dump(result, f, indent=2)
+    with open("summary_result.json", "wb") as f:
+        f.write(orjson.dumps(result, option=orjson.OPT_INDENT_2))
@@ -1,13 +1,25 @@
-import spacy
 import re
+from spacy.lang.en.stop_words import STOP_WORDS
 from atlassian import Confluence
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
 
-nlp = spacy.load("en_core_web_sm")
+# Only stop-word filtering is needed, so a word list and a regex stand in for the
+# spaCy pipeline; numbers such as 1,000 or 3.5 stay a single token, and clitics are
+# split off as spaCy does ("Don't" -> "Do" "n't", "company's" -> "company" "'s") so
+# the clitic stop words still match
+STOP_WORDS_LOWER = frozenset(word.lower() for word in STOP_WORDS)
+TOKEN_RE = re.compile(
+    r"\w+(?=n['’]t\b)|n['’]t\b|['’](?:s|re|ve|ll|d|m)\b|\w+(?:[.,]\w+)*|\S",
+    re.IGNORECASE,
+)
+
+def drop_stop_words(text):
+    return " ".join(token for token in TOKEN_RE.findall(text) if token.lower() not in STOP_WORDS_LOWER)
 
 def html_table_to_text(html_table):
-    soup = BeautifulSoup(html_table, "html.parser")
+    return table_to_text(BeautifulSoup(html_table, "html.parser"))
 
+def table_to_text(soup):
     # Extract table rows
     rows = soup.find_all("tr")
 
@@ -23,15 +35,14 @@ def html_table_to_text(html_table):
         headers = [cell.get_text(strip=True) for cell in first_row.find_all("td")]
         row_start_index = 1
 
-    # Iterate through rows and cells, and use NLP to generate sentences
+    # Iterate through rows and cells, and generate sentences without stop words
     text_rows = []
     for row in rows[row_start_index:]:
         cells = row.find_all("td")
         cell_sentences = []
         for header, cell in zip(headers, cells):
             # Generate a sentence using the header and cell value
-            doc = nlp(f"{header}: {cell.get_text(strip=True)}")
-            sentence = " ".join([token.text for token in doc if not token.is_stop])
+            sentence = drop_stop_words(f"{header}: {cell.get_text(strip=True)}")
             cell_sentences.append(sentence)
 
         # Combine cell sentences into a single row text
@@ -39,45 +50,43 @@ def html_table_to_text(html_table):
         text_rows.append(row_text)
 
     # Combine row texts into a single text
-    text = "nn".join(text_rows)
+    text = "\n\n".join(text_rows)
     return text
 
 def html_list_to_text(html_list):
-    soup = BeautifulSoup(html_list, "html.parser")
+    return list_to_text(BeautifulSoup(html_list, "html.parser"))
+
+def list_to_text(soup):
     items = soup.find_all("li")
     text_items = []
     for item in items:
         item_text = item.get_text(strip=True)
         text_items.append(f"- {item_text}")
-    text = "n".join(text_items)
+    text = "\n".join(text_items)
     return text
 
 def process_html_document(html_document):
 
+    # Everything below edits this one tree in place; nothing is re-parsed
     soup = BeautifulSoup(html_document, "html.parser")
 
-    # Replace tables with text using html_table_to_text
+    # Replace tables with text using table_to_text
     for table in soup.find_all("table"):
-        table_text = html_table_to_text(str(table))
-        table.replace_with(BeautifulSoup(table_text, "html.parser"))
+        table.replace_with(NavigableString(table_to_text(table)))
 
-    # Replace lists with text using html_list_to_text
+    # Replace lists with text using list_to_text
     for ul in soup.find_all("ul"):
-        ul_text = html_list_to_text(str(ul))
-        ul.replace_with(BeautifulSoup(ul_text, "html.parser"))
+        ul.replace_with(NavigableString(list_to_text(ul)))
 
     for ol in soup.find_all("ol"):
-        ol_text = html_list_to_text(str(ol))
-        ol.replace_with(BeautifulSoup(ol_text, "html.parser"))
+        ol.replace_with(NavigableString(list_to_text(ol)))
 
     # Replace all types of <br> with newlines
-    br_tags = re.compile('<br>|<br/>|<br />')
-    html_with_newlines = br_tags.sub('n', str(soup))
+    for br in soup.find_all("br"):
+        br.replace_with("\n")
 
     # Strip remaining HTML tags to isolate the text
-    soup_with_newlines = BeautifulSoup(html_with_newlines, "html.parser")
-
-    return soup_with_newlines.get_text()
+    return soup.get_text()
 
 # Extract the content in the "storage" format
 storage_value = page_content['body']['storage']['value']
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import datetime
-import time
+from pathlib import Path
 
 # Set page configuration
 st.set_page_config(
@@ -9,65 +9,61 @@ st.set_page_config(
     layout="centered"
 )
 
-# Custom CSS for a professional look
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 2.5rem;
-        font-weight: 700;
-        margin-bottom: 1rem;
-        color: #1E3A8A;
-    }
-    .subheader {
-        font-size: 1.5rem;
-        margin-bottom: 1.5rem;
-        color: #3B82F6;
-    }
-    .info-box {
-        background-color: #EFF6FF;
-        padding: 1.5rem;
-        border-radius: 0.5rem;
-        border-left: 5px solid #3B82F6;
-        margin-bottom: 1.5rem;
-    }
-    .feature-title {
-        font-size: 1.2rem;
-        font-weight: 600;
-        color: #1E3A8A;
-        margin-bottom: 0.5rem;
-    }
-    .button-container {
-        display: flex;
-        justify-content: center;
-        margin: 2rem 0;
-    }
-    .progress-container {
-        margin: 2rem 0;
-    }
-    .footer {
-        margin-top: 3rem;
-        text-align: center;
-        color: #6B7280;
-    }
-</style>
-""", unsafe_allow_html=True)
+# URL Information
+old_url = "http://eun043653-8082/"
+new_url = "http://int-intranet.nomurnow.com/nucleus/dqinsights/"
+user_guide = "https://confluence.nomura.com/ETCB/confluence/display/DataOffice/DQ+Insights"
+
+# Custom CSS for a professional look, kept in a stylesheet next to the app
+CSS_PATH = Path(__file__).parent / "static" / "redirect.css"
 
 # Header
-st.markdown('<p class="main-header">Website Migration Notice</p>', unsafe_allow_html=True)
-st.markdown('<p class="subheader">We\'ve upgraded our platform for a better experience</p>', unsafe_allow_html=True)
+HEADER = """
+<p class="main-header">Website Migration Notice</p>
+<p class="subheader">We've upgraded our platform for a better experience</p>
+"""
 
 # Information Box
-st.markdown("""
+INFO_BOX = """
 <div class="info-box">
     <p>Our website has moved to a new location with an improved user interface and enhanced features. 
     You'll be automatically redirected to the new site shortly, or you can click the button below to go there now.</p>
 </div>
-""", unsafe_allow_html=True)
+"""
 
-# URL Information
-old_url = "http://eun043653-8082/"
-new_url = "http://int-intranet.nomurnow.com/nucleus/dqinsights/"
-user_guide = "https://confluence.nomura.com/ETCB/confluence/display/DataOffice/DQ+Insights"
+
+# The static blocks are assembled once per process and sent in a single
+# st.markdown call rather than one call (and one browser update) per block
+@st.cache_data
+def _intro_html():
+    # The stylesheet is read once here and goes out as the page's only <style> block
+    css = f"<style>\n{CSS_PATH.read_text(encoding='utf-8')}</style>"
+    return "\n".join([css, HEADER, INFO_BOX])
+
+
+@st.cache_data
+def _resources_html(user_guide):
+    return f"""
+<p class="subheader">Resources to Get Started</p>
+<div class="info-box">
+    <p><strong>Need help navigating the new interface?</strong></p>
+    <p>Our comprehensive user guide provides step-by-step instructions on using all the new features:</p>
+    <p><a href="{user_guide}" target="_blank">{user_guide}</a></p>
+</div>
+"""
+
+
+@st.cache_data
+def _features_html(items):
+    # items is a tuple of (title, description) pairs so it can key the cache
+    return "".join(f"""
+<p class="feature-title">✨ {title}</p>
+<p>{description}</p>
+<hr>
+""" for title, description in items)
+
+
+st.markdown(_intro_html(), unsafe_allow_html=True)
 
 # Display URLs
 col1, col2 = st.columns(2)
@@ -103,48 +99,47 @@ with st.expander("Explore New Features and Improvements", expanded=True):
         }
     ]
     
-    for feature in features:
-        st.markdown(f"""
-        <p class="feature-title">✨ {feature['title']}</p>
-        <p>{feature['description']}</p>
-        <hr>
-        """, unsafe_allow_html=True)
+    st.markdown(
+        _features_html(tuple((feature["title"], feature["description"]) for feature in features)),
+        unsafe_allow_html=True,
+    )
 
 # User Guide Link
-st.markdown('<p class="subheader">Resources to Get Started</p>', unsafe_allow_html=True)
-st.markdown(f"""
-<div class="info-box">
-    <p><strong>Need help navigating the new interface?</strong></p>
-    <p>Our comprehensive user guide provides step-by-step instructions on using all the new features:</p>
-    <p><a href="{user_guide}" target="_blank">{user_guide}</a></p>
-</div>
-""", unsafe_allow_html=True)
+st.markdown(_resources_html(user_guide), unsafe_allow_html=True)
 
 # Redirect button
-st.markdown('<div class="button-container">', unsafe_allow_html=True)
-if st.button("Go to New Website Now", key="redirect_button", use_container_width=True):
-    st.markdown(f'<meta http-equiv="refresh" content="0;url={new_url}">', unsafe_allow_html=True)
-st.markdown('</div>', unsafe_allow_html=True)
+# A fragment, so a click reruns only the button instead of rebuilding the whole page
+@st.fragment
+def redirect_button(new_url):
+    if st.button("Go to New Website Now", key="redirect_button", use_container_width=True):
+        st.markdown(f'<meta http-equiv="refresh" content="0;url={new_url}">', unsafe_allow_html=True)
+
+
+redirect_button(new_url)
 
 # Automatic redirect progress bar
-st.markdown('<div class="progress-container">', unsafe_allow_html=True)
-st.write("You will be automatically redirected in 15 seconds...")
-progress_bar = st.progress(0)
-for i in range(100):
-    # Update progress bar
-    progress_bar.progress(i + 1)
-    # Sleep for a short time to simulate progress
-    time.sleep(0.15)
-    # If completed, redirect
-    if i == 99:
-        st.markdown(f'<meta http-equiv="refresh" content="0;url={new_url}">', unsafe_allow_html=True)
-        break
-st.markdown('</div>', unsafe_allow_html=True)
+# The countdown runs in the browser: the bar is a CSS animation and the redirect a
+# meta refresh, so the script finishes immediately instead of sleeping for 15 seconds.
+# The notice and the bar go out as one element.
+st.markdown(f"""
+<div class="progress-container">
+    <p>You will be automatically redirected in 15 seconds...</p>
+    <meta http-equiv="refresh" content="15;url={new_url}">
+    <div class="redirect-bar"><div class="redirect-bar-fill"></div></div>
+</div>
+""", unsafe_allow_html=True)
 
 # Footer
+# Streamlit re-executes the whole script on every rerun, so a module-level constant
+# would still be recomputed; cache the date string instead, refreshed hourly
+@st.cache_data(ttl=3600)
+def _last_updated():
+    return datetime.now().strftime("%B %d, %Y")
+
+
 st.markdown("""
 <div class="footer">
     <p>If you encounter any issues during the transition, please contact the support team.</p>
     <p>Last updated: {}</p>
 </div>
-""".format(datetime.now().strftime("%B %d, %Y")), unsafe_allow_html=True)
+""".format(_last_updated()), unsafe_allow_html=True)
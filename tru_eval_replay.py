@@ -9,6 +9,7 @@ Usage:
 What it does:
 - Loads a CSV of existing LLM runs/logs (rows should contain input/output and optionally ground_truth/context).
 - Auto-detects common column names and maps them to TruLens span attributes.
+- With --dry-run, stops after printing the detected mapping and metrics (no row parsing, no Snowflake connection).
 - Creates a TruApp and RunConfig, registers the app with Snowflake, creates a run, starts invocation using the CSV as a DATAFRAME source, and computes appropriate metrics (only metrics possible given available columns).
 
 Notes & assumptions:
@@ -18,8 +19,11 @@ Notes & assumptions:
 """
 import os
 import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import pandas as pd
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 # --- TruLens imports ---
 try:
@@ -32,11 +36,44 @@ except Exception as e:
     print(e)
     # We'll still generate the script. If runtime imports fail, user must fix environment.
 
+# Streamlit is optional: only used to share the connector across reruns when this
+# module is imported from a Streamlit page
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+# pyarrow is optional: when present the CSV is parsed by its multithreaded reader
+# and string columns stay Arrow-backed instead of one Python str per cell.
+# keep_default_na=False reads empty cells as "" on both engines: otherwise they come
+# back as pd.NA (Arrow) or NaN, which the replay would hand to TruLens as an output
+try:
+    import pyarrow  # noqa: F401
+    CSV_READ_OPTIONS = {"engine": "pyarrow", "dtype": "string[pyarrow]", "keep_default_na": False}
+except ImportError:
+    CSV_READ_OPTIONS = {"engine": "c", "dtype": str, "keep_default_na": False}
+
+# Errors worth retrying when connecting to Snowflake; anything else (bad credentials,
+# wrong SDK signature) fails immediately
+TRANSIENT_CONNECT_ERRORS = (ConnectionError, TimeoutError)
+try:
+    from snowflake.connector.errors import OperationalError
+    TRANSIENT_CONNECT_ERRORS += (OperationalError,)
+except ImportError:
+    pass
+
 COMMON_INPUT_NAMES = ["input", "prompt", "query", "user_query", "question", "prompt_text"]
 COMMON_OUTPUT_NAMES = ["output", "response", "answer", "generated", "model_output"]
 COMMON_GT_NAMES = ["ground_truth", "golden_answer", "golden", "expected", "target"]
 COMMON_CONTEXT_NAMES = ["context", "retrieved_contexts", "contexts", "kb", "passages"]
 
+# Set views of the candidate lists for fast disjointness/intersection checks;
+# the lists above still define priority when several candidates are present
+COMMON_INPUT_SET = frozenset(COMMON_INPUT_NAMES)
+COMMON_OUTPUT_SET = frozenset(COMMON_OUTPUT_NAMES)
+COMMON_GT_SET = frozenset(COMMON_GT_NAMES)
+COMMON_CONTEXT_SET = frozenset(COMMON_CONTEXT_NAMES)
+
 METRICS_IF_AVAILABLE = {
     "correctness": ["RECORD_ROOT.INPUT", "RECORD_ROOT.OUTPUT", "RECORD_ROOT.GROUND_TRUTH_OUTPUT"],
     "answer_relevance": ["RECORD_ROOT.INPUT", "RECORD_ROOT.OUTPUT"],
@@ -45,22 +82,62 @@ METRICS_IF_AVAILABLE = {
     "coherence": ["RECORD_ROOT.OUTPUT"]
 }
 
+# Requirement sets for a single subset check per metric
+_METRIC_REQS = {metric: frozenset(reqs) for metric, reqs in METRICS_IF_AVAILABLE.items()}
+
+
+@lru_cache(maxsize=4)
+def _load_csv(path: str, mtime: float, usecols: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+    # mtime is only part of the cache key, so an edited file is parsed again
+    return pd.read_csv(path, usecols=usecols and list(usecols), **CSV_READ_OPTIONS)
+
+
+def load_csv(path: str, usecols: Optional[Tuple[str, ...]] = None) -> pd.DataFrame:
+    """
+    Load the CSV as strings, reusing the parsed DataFrame while the file is unchanged.
+
+    Pass usecols to parse only those columns; everything is read as strings, which
+    skips pandas' type inference (the replay only ever passes text through).
+    Uses the pyarrow engine and Arrow-backed strings when pyarrow is installed.
+
+    Each call gets its own copy: the frame is handed to run.start, and anything that
+    modified the cached object would corrupt every later load of the same file.
+    """
+    return _load_csv(path, os.path.getmtime(path), usecols).copy()
+
+
+def read_csv_header(path: str) -> pd.DataFrame:
+    """Return an empty DataFrame carrying only the CSV's column names."""
+    return pd.read_csv(path, nrows=0)
+
 
 def detect_columns(df: pd.DataFrame) -> Dict[str, str]:
     """Detect column names in the user's CSV and return a mapping from span-attributes to df column names."""
-    cols = {c.lower(): c for c in df.columns}
+    # Copy so callers can't modify the cached mapping
+    return dict(_detect_columns(tuple(df.columns)))
 
-    def find_one(candidates: List[str]):
-        for cand in candidates:
-            if cand in cols:
-                return cols[cand]
+
+def _first_match(cand_set: frozenset, candidates: List[str], cols: Dict[str, str], keyset) -> Optional[str]:
+    """Return the column for the highest-priority candidate present, or None."""
+    if cand_set.isdisjoint(keyset):
         return None
+    present = cand_set & keyset
+    for cand in candidates:
+        if cand in present:
+            return cols[cand]
+    return None
+
+
+@lru_cache(maxsize=None)
+def _detect_columns(columns: Tuple[str, ...]) -> Dict[str, str]:
+    cols = {c.lower(): c for c in columns}
+    keyset = cols.keys()
 
     mapping = {}
-    in_col = find_one(COMMON_INPUT_NAMES)
-    out_col = find_one(COMMON_OUTPUT_NAMES)
-    gt_col = find_one(COMMON_GT_NAMES)
-    ctx_col = find_one(COMMON_CONTEXT_NAMES)
+    in_col = _first_match(COMMON_INPUT_SET, COMMON_INPUT_NAMES, cols, keyset)
+    out_col = _first_match(COMMON_OUTPUT_SET, COMMON_OUTPUT_NAMES, cols, keyset)
+    gt_col = _first_match(COMMON_GT_SET, COMMON_GT_NAMES, cols, keyset)
+    ctx_col = _first_match(COMMON_CONTEXT_SET, COMMON_CONTEXT_NAMES, cols, keyset)
 
     if in_col:
         mapping["RECORD_ROOT.INPUT"] = in_col
@@ -77,15 +154,17 @@ def detect_columns(df: pd.DataFrame) -> Dict[str, str]:
 
 def pick_metrics_from_mapping(mapping: Dict[str, str]) -> List[str]:
     """Return a list of metrics that can be computed given the available span-attribute -> column mapping."""
-    available = set(mapping.keys())
-    chosen = []
-    for metric, reqs in METRICS_IF_AVAILABLE.items():
-        if all(r in available for r in reqs):
-            chosen.append(metric)
+    # Only the available attributes matter, so the result is cached on the key set
+    return list(_pick_metrics(frozenset(mapping)))
+
+
+@lru_cache(maxsize=None)
+def _pick_metrics(available: frozenset) -> Tuple[str, ...]:
+    chosen = [metric for metric, reqs in _METRIC_REQS.items() if reqs <= available]
     # Coherence only needs output; include it if output present
     if "RECORD_ROOT.OUTPUT" in available and "coherence" not in chosen:
         chosen.append("coherence")
-    return chosen
+    return tuple(chosen)
 
 
 class ReplayApp:
@@ -100,38 +179,85 @@ class ReplayApp:
 
     def __init__(self, output_col: str):
         self.output_col = output_col
+        # Row accessor, specialized on the first record so the per-row path skips type dispatch
+        self._extract = self._specialize
 
     # Keep this method simple; decorated at registration time if needed.
+    # TruApp holds on to this bound method, so the specialization happens behind it.
     def replay(self, record: Dict) -> str:
-        # record might be a pandas Series or dict - handle both
+        return self._extract(record)
+
+    def _specialize(self, record) -> str:
+        # record might be a pandas Series or dict - the SDK feeds every row the same way
         if isinstance(record, pd.Series):
-            return record.get(self.output_col, "")
+            self._extract = self._from_series
         elif isinstance(record, dict):
-            return record.get(self.output_col, "")
+            self._extract = self._from_dict
         else:
-            # fallback
-            try:
-                return getattr(record, self.output_col)
-            except Exception:
-                return ""
+            self._extract = self._from_attribute
+        return self._extract(record)
+
+    def _from_series(self, record: pd.Series) -> str:
+        # Index membership + __getitem__ is cheaper than Series.get
+        return record[self.output_col] if self.output_col in record.index else ""
+
+    def _from_dict(self, record: Dict) -> str:
+        return record.get(self.output_col, "")
+
+    def _from_attribute(self, record) -> str:
+        # fallback
+        try:
+            return getattr(record, self.output_col)
+        except Exception:
+            return ""
+
+
+def _resource_cache(func):
+    """Cache a resource factory across reruns/sessions under Streamlit, else for the process."""
+    if st is not None and st.runtime.exists():
+        return st.cache_resource(func)
+    return lru_cache(maxsize=1)(func)
+
+
+@_resource_cache
+def get_connector(account, user, password, warehouse, database, schema) -> object:
+    """Create the Snowflake connector once per set of connection parameters."""
+    return SnowflakeConnector(
+        account=account,
+        user=user,
+        password=password,
+        warehouse=warehouse,
+        database=database,
+        schema=schema,
+    )
 
 
-def make_snowflake_connector_from_env(args) -> object:
+def make_snowflake_connector_from_env(args, attempts: int = 3) -> object:
     # Replace this with your org's Snowflake connector wrapper
     # This is a placeholder to show required parameters; the real SnowflakeConnector
     # constructor may differ.
-    try:
-        return SnowflakeConnector(
-            account=args.snowflake_account,
-            user=args.snowflake_user,
-            password=args.snowflake_password,
-            warehouse=args.snowflake_warehouse,
-            database=args.snowflake_database,
-            schema=args.snowflake_schema,
-        )
-    except Exception as e:
-        print("Ensure SnowflakeConnector class and parameters match your SDK. Error:", e)
-        raise
+    # Failed attempts are not cached, so a retry really reconnects; a successful
+    # one is reused by later calls with the same parameters
+    for attempt in range(attempts):
+        try:
+            return get_connector(
+                args.snowflake_account,
+                args.snowflake_user,
+                args.snowflake_password,
+                args.snowflake_warehouse,
+                args.snowflake_database,
+                args.snowflake_schema,
+            )
+        except TRANSIENT_CONNECT_ERRORS as e:
+            if attempt == attempts - 1:
+                print(f"Could not connect to Snowflake after {attempts} attempts. Error:", e)
+                raise
+            delay = 2 ** attempt
+            print(f"Snowflake connection failed ({e}); retrying in {delay}s...")
+            time.sleep(delay)
+        except Exception as e:
+            print("Ensure SnowflakeConnector class and parameters match your SDK. Error:", e)
+            raise
 
 
 def main():
@@ -141,21 +267,26 @@ def main():
     parser.add_argument("--app-version", default="1.0")
     parser.add_argument("--run-name", required=True)
     parser.add_argument("--llm-judge", default=None, help="Optional LLM judge name (e.g. mistral-large2)")
+    parser.add_argument("--max-wait", type=float, default=3600,
+                        help="Seconds to wait for the run invocation to finish before giving up")
+    parser.add_argument("--parallel-metrics", action="store_true",
+                        help="Submit one compute_metrics call per metric concurrently instead of a single batched call")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the detected mapping and metrics, then exit without loading rows or connecting to Snowflake")
 
     # Snowflake args (can be set via env vars in production)
-    parser.add_argument("--snowflake-account", default=os.environ.get("SNOWFLAKE_ACCOUNT"))
-    parser.add_argument("--snowflake-user", default=os.environ.get("SNOWFLAKE_USER"))
-    parser.add_argument("--snowflake-password", default=os.environ.get("SNOWFLAKE_PASSWORD"))
-    parser.add_argument("--snowflake-warehouse", default=os.environ.get("SNOWFLAKE_WAREHOUSE"))
-    parser.add_argument("--snowflake-database", default=os.environ.get("SNOWFLAKE_DATABASE"))
-    parser.add_argument("--snowflake-schema", default=os.environ.get("SNOWFLAKE_SCHEMA"))
+    env = os.environ
+    parser.add_argument("--snowflake-account", default=env.get("SNOWFLAKE_ACCOUNT"))
+    parser.add_argument("--snowflake-user", default=env.get("SNOWFLAKE_USER"))
+    parser.add_argument("--snowflake-password", default=env.get("SNOWFLAKE_PASSWORD"))
+    parser.add_argument("--snowflake-warehouse", default=env.get("SNOWFLAKE_WAREHOUSE"))
+    parser.add_argument("--snowflake-database", default=env.get("SNOWFLAKE_DATABASE"))
+    parser.add_argument("--snowflake-schema", default=env.get("SNOWFLAKE_SCHEMA"))
 
     args = parser.parse_args()
 
-    df = pd.read_csv(args.csv)
-    print(f"Loaded {len(df)} rows from {args.csv}")
-
-    mapping = detect_columns(df)
+    # Detect columns from the header alone, then parse only the mapped columns
+    mapping = detect_columns(read_csv_header(args.csv))
     print("Detected mapping:")
     for k, v in mapping.items():
         print(f"  {k} -> {v}")
@@ -163,14 +294,22 @@ def main():
     metrics = pick_metrics_from_mapping(mapping)
     print("Metrics that will be computed based on available columns:", metrics)
 
-    # Create Snowflake connector
-    connector = make_snowflake_connector_from_env(args)
-
-    # Create Replay app instance
+    # Validate and honour --dry-run off the header alone, before parsing rows or
+    # touching Snowflake
     output_col = mapping.get("RECORD_ROOT.OUTPUT")
     if output_col is None:
         raise ValueError("CSV does not contain an output column. One of these column names is required: " + ",".join(COMMON_OUTPUT_NAMES))
 
+    if args.dry_run:
+        return
+
+    df = load_csv(args.csv, usecols=tuple(dict.fromkeys(mapping.values())))
+    print(f"Loaded {len(df)} rows from {args.csv}")
+
+    # Create Snowflake connector
+    connector = make_snowflake_connector_from_env(args)
+
+    # Create Replay app instance
     replay_app = ReplayApp(output_col=output_col)
 
     # Register app in TruLens (adjust constructor names as necessary for your SDK version)
@@ -203,14 +342,20 @@ def main():
     # Start run using DataFrame source
     run.start(input_df=df)
 
-    # Wait and poll status until invocation completes or partially completes (simple polling)
-    import time
+    # Wait and poll status until invocation completes or partially completes; the poll
+    # interval backs off so long invocations don't cost a status RPC every few seconds
+    delay = 2.0
+    deadline = time.monotonic() + args.max_wait
     while True:
         status = run.get_status()
         print("Run status:", status)
         if status in ("INVOCATION_COMPLETED", "INVOCATION_PARTIALLY_COMPLETED", "INVOCATION_FAILED"):
             break
-        time.sleep(5)
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Run invocation did not finish within {args.max_wait:g}s (last status: {status})")
+        # Never sleep past the deadline; the last poll lands on it
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        delay = min(delay * 1.5, 60.0)
 
     print("Invocation finished. Starting metric computation...")
     # compute metrics; if none found, compute at least coherence if possible
@@ -218,8 +363,14 @@ def main():
         metrics = ["coherence"] if "RECORD_ROOT.OUTPUT" in mapping else []
 
     if metrics:
-        compute_job = run.compute_metrics(metrics=metrics)
-        print("Triggered metric computation job. compute_metrics is non-blocking.")
+        if args.parallel_metrics:
+            # Each submission is a network round trip; overlap them since the jobs are independent
+            with ThreadPoolExecutor(max_workers=len(metrics)) as executor:
+                compute_jobs = list(executor.map(lambda m: run.compute_metrics(metrics=[m]), metrics))
+            print(f"Triggered {len(compute_jobs)} metric computation jobs. compute_metrics is non-blocking.")
+        else:
+            compute_job = run.compute_metrics(metrics=metrics)
+            print("Triggered metric computation job. compute_metrics is non-blocking.")
         print("You can check job status from SnowSight AI & ML -> Evaluations or via SDK methods.")
     else:
         print("No metrics available to compute with the provided CSV columns.")